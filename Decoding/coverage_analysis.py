@@ -0,0 +1,553 @@
+import csv
+import numpy as np
+from recovery import read_sequences
+
+# Coverage and error analysis of a sequencing run against the reference pool
+reference_file = 'DNA.csv'  # DNA.csv written by encoding.py
+file_path = "low_freq_5_percent.txt"
+
+KMER_SIZE = 12
+KMER_STEP = 2       # Distance between the k-mers sampled from a read
+ADDRESS_LENGTH = 10
+MAX_MISMATCHES = 6  # Largest Hamming distance to the closest oligo of a read without indels
+MAX_EDITS = 10      # Largest edit distance to the closest oligo of a read with indels
+MAX_CANDIDATES = 8  # Oligos with the most k-mer votes that are compared with a damaged read
+ADDRESS_BATCH = 256  # Reads compared with every reference address together
+DENSE_KMER_OWNERS = 32  # k-mers found in more oligos vote through a dense matrix
+BAND_WIDTH = 6      # Largest indel offset considered by the alignment
+MAX_SUBSTITUTIONS = 2  # Same-length reads with more mismatches are aligned, they may hold an indel pair
+MAX_LENGTH = 100
+BATCH_SIZE = 4096   # Reads assigned and aligned together
+
+# One-hot code of every byte, other than A/C/G/T = all zero
+ONE_HOT = np.zeros((256, 4), dtype=np.float32)
+for code, base in enumerate('ACGT'):
+    ONE_HOT[ord(base), code] = 1
+
+
+def load_reference(path):
+    """
+    Read the reference oligos from DNA.csv.
+
+    Args:
+        path: Path of the DNA.csv file written by encoding.py
+
+    Returns:
+        Tuple containing:
+        - oligos: Reference sequences in row-major order
+        - addresses: (row, col) of every reference sequence, starting at 1
+    """
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        rows = list(csv.reader(csvfile))
+
+    oligos = []
+    addresses = []
+    for i, row in enumerate(rows):
+        for j, seq in enumerate(row):
+            oligos.append(seq)
+            addresses.append((i + 1, j + 1))
+    return oligos, addresses
+
+def build_kmer_index(oligos, k=KMER_SIZE):
+    """
+    Index the k-mers of the reference oligos.
+
+    Each k-mer votes for every oligo that contains it, with weight
+    1 / (number of those oligos), so k-mers of repetitive payloads (e.g. rows
+    of white pixels) still count without outweighing unique ones. The owners
+    of the rare k-mers are stored back to back, so the votes of a batch of
+    reads are gathered with one indexing operation; the few k-mers found in
+    more than DENSE_KMER_OWNERS oligos vote through a matrix product instead.
+
+    Args:
+        oligos: Reference sequences
+        k: k-mer length
+
+    Returns:
+        Dictionary with 'ids' (k-mer -> number, frequent k-mers first),
+        'dense' (vote weights of the frequent k-mers, k-mers x oligos),
+        'starts' (start of the owners of every rare k-mer, followed by the
+        total), 'owners' (oligo indices, k-mer after k-mer) and 'weights'
+        (vote weight of every entry of owners)
+    """
+    owners = {}
+    for index, seq in enumerate(oligos):
+        for offset in range(len(seq) - k + 1):
+            ids = owners.setdefault(seq[offset:offset + k], [])
+            if not ids or ids[-1] != index:
+                ids.append(index)
+    frequent = [kmer for kmer, ids in owners.items() if len(ids) > DENSE_KMER_OWNERS]
+    rare = [kmer for kmer, ids in owners.items() if len(ids) <= DENSE_KMER_OWNERS]
+
+    dense = np.zeros((len(frequent), len(oligos)), dtype=np.float32)
+    for number, kmer in enumerate(frequent):
+        dense[number, owners[kmer]] = 1.0 / len(owners[kmer])
+    sizes = np.array([len(owners[kmer]) for kmer in rare], dtype=np.int64)
+    return {
+        'ids': {kmer: number for number, kmer in enumerate(frequent + rare)},
+        'dense': dense,
+        'starts': np.concatenate([[0], np.cumsum(sizes)]),
+        'owners': np.array([index for kmer in rare for index in owners[kmer]], dtype=np.int64),
+        'weights': np.repeat(1.0 / sizes, sizes),
+    }
+
+def address_distances(prefixes, address_codes, band=2):
+    """
+    Edit distance between the address region of reads and reference addresses.
+
+    The whole reference address is aligned against a prefix of the read, so an
+    indel in the address does not shift the comparison.
+
+    Args:
+        prefixes: uint8 matrix (reads x ADDRESS_LENGTH + band) of the read starts
+        address_codes: uint8 matrix (candidates x ADDRESS_LENGTH) of reference addresses
+        band: Largest length difference between read prefix and address
+
+    Returns:
+        Matrix (reads x candidates) of distances
+    """
+    n_candidates, length = address_codes.shape
+    columns = np.arange(length + 1, dtype=np.int8)
+    previous = np.broadcast_to(columns, (len(prefixes), n_candidates, length + 1)).copy()
+    best = np.full((len(prefixes), n_candidates), length + band + 1, dtype=np.int8)
+    for i in range(1, length + band + 1):
+        current = np.empty_like(previous)
+        current[:, :, 0] = i
+        mismatch = address_codes[None, :, :] != prefixes[:, None, i - 1, None]
+        current[:, :, 1:] = np.minimum(previous[:, :, :-1] + mismatch, previous[:, :, 1:] + 1)
+        # Deletions: current[j] = min over k <= j of current[k] + (j - k)
+        current = np.minimum.accumulate(current - columns, axis=2) + columns
+        if i >= length - band:
+            best = np.minimum(best, current[:, :, length])
+        previous = current
+    return best
+
+def to_codes(sequences, width=None):
+    """uint8 matrix of the bytes of the sequences, padded with N to width (or the longest)."""
+    width = width or max(len(seq) for seq in sequences)
+    return np.frombuffer(''.join(seq.ljust(width, 'N') for seq in sequences).encode('ascii', 'replace'),
+                         dtype=np.uint8).reshape(len(sequences), width)
+
+def build_read_index(oligos):
+    """
+    Build the lookup tables used by assign_batch.
+
+    Returns:
+        Dictionary with 'exact' (sequence -> oligo), 'by_length' (length ->
+        (oligo indices, one-hot matrix of those oligos)), 'address' (address ->
+        oligo), 'kmer' (see build_kmer_index) and 'address_codes' (uint8 matrix
+        of the addresses)
+    """
+    by_length = {}
+    for index, seq in enumerate(oligos):
+        by_length.setdefault(len(seq), []).append(index)
+    return {
+        'exact': {seq: index for index, seq in reversed(list(enumerate(oligos)))},
+        'by_length': {length: (np.array(ids), ONE_HOT[to_codes([oligos[i] for i in ids])].reshape(len(ids), -1))
+                      for length, ids in by_length.items()},
+        'address': {seq[:ADDRESS_LENGTH]: index for index, seq in reversed(list(enumerate(oligos)))},
+        'kmer': build_kmer_index(oligos),
+        'address_codes': to_codes([seq[:ADDRESS_LENGTH] for seq in oligos]),
+    }
+
+def nearest_oligos(sequences, read_index):
+    """
+    Closest reference oligo by Hamming distance for a batch of reads.
+
+    Args:
+        sequences: Reads of equal length
+        read_index: Lookup tables built by build_read_index
+
+    Returns:
+        Array with the unique closest oligo of every read, -1 if it has more
+        than MAX_MISMATCHES mismatches (or no oligo has the read length) and
+        -2 if several oligos are equally close
+    """
+    nearest = np.full(len(sequences), -1, dtype=np.int64)
+    same_length = read_index['by_length'].get(len(sequences[0]))
+    if same_length is None:
+        return nearest
+    ids, one_hot = same_length
+    # Matching bases of every read and oligo in one matrix product
+    matches = ONE_HOT[to_codes(sequences)].reshape(len(sequences), -1) @ one_hot.T
+    mismatches = len(sequences[0]) - np.rint(matches).astype(np.int64)
+    best = mismatches.min(axis=1)
+    ties = np.count_nonzero(mismatches == best[:, None], axis=1)
+    close = best <= MAX_MISMATCHES
+    nearest[close] = np.where(ties[close] == 1, ids[mismatches[close].argmin(axis=1)], -2)
+    return nearest
+
+def kmer_votes(sequences, n_oligos, kmer_index, k=KMER_SIZE, step=KMER_STEP):
+    """
+    Weighted k-mer votes of a batch of reads.
+
+    Returns:
+        Matrix (reads x oligos) with the summed weights of the k-mers every
+        read shares with every oligo
+    """
+    n_frequent = len(kmer_index['dense'])
+    hits = []
+    rows = []
+    for row, seq in enumerate(sequences):
+        for offset in range(0, len(seq) - k + 1, step):
+            number = kmer_index['ids'].get(seq[offset:offset + k])
+            if number is not None:
+                hits.append(number)
+                rows.append(row)
+    hits = np.array(hits, dtype=np.int64)
+    rows = np.array(rows, dtype=np.int64)
+
+    frequent = hits < n_frequent
+    counts = np.bincount(rows[frequent] * n_frequent + hits[frequent],
+                         minlength=len(sequences) * n_frequent).reshape(len(sequences), n_frequent)
+    votes = counts.astype(np.float32) @ kmer_index['dense']
+
+    starts = kmer_index['starts']
+    hits = hits[~frequent] - n_frequent
+    sizes = starts[hits + 1] - starts[hits]
+    # Position of every owner entry of every rare hit
+    entries = np.repeat(starts[hits] - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+    flat = np.repeat(rows[~frequent], sizes) * n_oligos + kmer_index['owners'][entries]
+    votes += np.bincount(flat, weights=kmer_index['weights'][entries],
+                         minlength=len(sequences) * n_oligos).reshape(len(sequences), n_oligos)
+    return votes
+
+def assign_damaged_reads(sequences, oligos, read_index, max_candidates=MAX_CANDIDATES):
+    """
+    Assign reads that are neither exact nor close to an oligo of their length.
+
+    The candidates of a read are the max_candidates oligos with the most
+    k-mer votes and the oligo whose address equals the start of the read.
+    When more oligos are within one vote of the best, as for repetitive
+    payloads shared by many oligos, the ones among them with the closest
+    address are added; without any vote, the closest addresses of the whole
+    pool are used. No candidate is trusted on its own: the read goes to the
+    unique candidate with the smallest edit distance over the whole sequence,
+    if it is at most MAX_EDITS.
+
+    Args:
+        sequences: Read sequences
+        oligos: Reference sequences
+        read_index: Lookup tables built by build_read_index
+        max_candidates: Number of best voted oligos compared with every read
+
+    Returns:
+        Array with the index of the reference oligo of every read, -1 if it
+        is too far from every candidate and -2 if several are equally close
+    """
+    n_reads = len(sequences)
+    n_oligos = len(oligos)
+    votes = kmer_votes(sequences, n_oligos, read_index['kmer'])
+    best = votes.max(axis=1)
+    top = np.argpartition(-votes, min(max_candidates, n_oligos - 1), axis=1)[:, :max_candidates]
+    tied = votes > best[:, None] - 1
+    candidates = np.zeros((n_reads, n_oligos), dtype=bool)
+    candidates[np.arange(n_reads)[:, None], top] = True
+    candidates &= votes > 0
+
+    # An address found at the start of the read is the closest one
+    address_hits = np.array([read_index['address'].get(seq[:ADDRESS_LENGTH], -1) for seq in sequences])
+    found = address_hits >= 0
+    candidates[found, address_hits[found]] = True
+
+    # Otherwise the closest addresses among many equally voted oligos, or among all without votes
+    by_address = np.flatnonzero(~found & ((tied.sum(axis=1) > max_candidates) | (best == 0)))
+    for start in range(0, len(by_address), ADDRESS_BATCH):
+        rows = by_address[start:start + ADDRESS_BATCH]
+        prefixes = to_codes([sequences[row][:ADDRESS_LENGTH + 2] for row in rows], ADDRESS_LENGTH + 2)
+        distances = address_distances(prefixes, read_index['address_codes'])
+        distances[~(tied[rows] | (best[rows, None] == 0))] = np.iinfo(distances.dtype).max
+        candidates[rows] |= distances == distances.min(axis=1, keepdims=True)
+
+    assigned = np.full(n_reads, -1, dtype=np.int64)
+    # Many oligos with the same address distance, the read cannot be placed
+    crowded = candidates.sum(axis=1) > 2 * max_candidates + 1
+    assigned[crowded] = -2
+    candidates[crowded] = False
+    pair_reads, pair_oligos = np.nonzero(candidates)
+    if not len(pair_reads):
+        return assigned
+    distances = edit_distances([sequences[row] for row in pair_reads], [oligos[index] for index in pair_oligos])
+
+    # Smallest distance of every read and the number of candidates reaching it
+    starts = np.flatnonzero(np.r_[True, pair_reads[1:] != pair_reads[:-1]])
+    smallest = np.minimum.reduceat(distances, starts)
+    reached = distances == np.repeat(smallest, np.diff(np.r_[starts, len(distances)]))
+    ties = np.add.reduceat(reached.astype(np.int64), starts)
+    rows = pair_reads[starts]
+    winners = pair_oligos[reached][np.cumsum(np.r_[0, ties[:-1]])]
+    close = smallest <= MAX_EDITS
+    assigned[rows[close]] = np.where(ties[close] == 1, winners[close], -2)
+    return assigned
+
+def assign_batch(sequences, oligos, read_index):
+    """
+    Find the reference oligo every read of a batch comes from.
+
+    Exact copies are looked up directly. A read with the length of a reference
+    oligo goes to the oligo with the fewest mismatches over the whole sequence,
+    if it is unique and has at most MAX_MISMATCHES. Other reads are handled by
+    assign_damaged_reads. The decoded address alone is never trusted, since a
+    damaged address often decodes to another valid one.
+
+    Args:
+        sequences: Read sequences
+        oligos: Reference sequences
+        read_index: Lookup tables built by build_read_index
+
+    Returns:
+        Array with the index of the reference oligo of every read, negative
+        for reads that cannot be assigned unambiguously
+    """
+    assigned = np.full(len(sequences), -1, dtype=np.int64)
+    by_length = {}
+    for p, seq in enumerate(sequences):
+        index = read_index['exact'].get(seq)
+        if index is None:
+            by_length.setdefault(len(seq), []).append(p)
+        else:
+            assigned[p] = index
+
+    damaged = []
+    for length, group in by_length.items():
+        nearest = nearest_oligos([sequences[p] for p in group], read_index)
+        assigned[group] = nearest
+        damaged.extend(p for p, index in zip(group, nearest) if index == -1)
+    if damaged:
+        assigned[damaged] = assign_damaged_reads([sequences[p] for p in damaged], oligos, read_index)
+    return assigned
+
+def band_rows(read_codes, ref_codes, band=BAND_WIDTH):
+    """
+    Rows of the banded edit distance matrices of a batch of read / reference pairs.
+
+    The pairs are padded to the longest read and reference: a cell only
+    depends on the cells above and to its left, so the padding does not change
+    the matrix of shorter pairs. Only the band is stored, column d of row i
+    holding reference position j = i + d - band; within a row the deletion
+    moves are resolved with a running minimum instead of a loop.
+
+    Args:
+        read_codes: uint8 matrix of the reads (see to_codes)
+        ref_codes: uint8 matrix of the references, one per read
+        band: Largest offset between read and reference positions
+
+    Yields:
+        Row i = 0 .. longest read, as a matrix (pairs x band columns + 1); the
+        extra last column stays inf, it is read by the insertion move at the
+        band edge
+    """
+    size, n_max = read_codes.shape
+    m_max = ref_codes.shape[1]
+    inf = n_max + m_max + 1
+    width = 2 * band + 1
+    diagonals = np.arange(width)
+    current = np.full((size, width + 1), inf, dtype=np.int16)
+    current[:, band:width] = diagonals[band:] - band
+    yield current
+    for i in range(1, n_max + 1):
+        j = i + diagonals - band
+        previous = current
+        mismatch = read_codes[:, i - 1, None] != ref_codes[:, np.clip(j - 1, 0, m_max - 1)]
+        row = np.minimum(previous[:, :width] + mismatch, previous[:, 1:] + 1)
+        row[:, j == 0] = i
+        row[:, (j < 0) | (j > m_max)] = inf
+        # Deletions: row[d] = min over k <= d of row[k] + (d - k)
+        row = np.minimum.accumulate(row - diagonals, axis=1) + diagonals
+        row[:, (j < 0) | (j > m_max)] = inf
+        current = np.full((size, width + 1), inf, dtype=np.int16)
+        current[:, :width] = row
+        yield current
+
+def edit_distances(reads, refs, band=BAND_WIDTH):
+    """
+    Edit distance of every read / reference pair, computed together.
+
+    Returns:
+        Array with the distance of every pair, larger than any real distance
+        for the pairs that do not fit in the band
+    """
+    n = np.array([len(read) for read in reads])
+    m = np.array([len(ref) for ref in refs])
+    distances = np.full(len(reads), 2 * (n.max() + m.max()) + 1)
+    fits = np.abs(n - m) <= band
+    for i, row in enumerate(band_rows(to_codes(reads), to_codes(refs), band)):
+        done = fits & (n == i)
+        distances[done] = row[done, m[done] - i + band]
+    return distances
+
+def align_batch(reads, refs, band=BAND_WIDTH):
+    """
+    Banded global alignment with unit edit costs of a batch of read / reference pairs.
+
+    The matrices of all pairs are filled together by band_rows and traced
+    back together.
+
+    Args:
+        reads: Read sequences
+        refs: Reference sequences, one per read
+        band: Largest offset between read and reference positions
+
+    Returns:
+        Tuple containing:
+        - ops: Operation of every alignment step, 0 '=', 1 substitution,
+          2 insertion before the position, 3 deletion, -1 after the alignment ended
+        - positions: Reference position of every step
+        - aligned: False for the pairs that do not fit in the band
+    """
+    n = np.array([len(read) for read in reads])
+    m = np.array([len(ref) for ref in refs])
+    aligned = np.abs(n - m) <= band
+    n_max, m_max = int(n.max()), int(m.max())
+
+    size = len(reads)
+    read_codes = to_codes(reads)
+    ref_codes = to_codes(refs)
+    cost = np.stack(list(band_rows(read_codes, ref_codes, band)), axis=1)
+
+    rows = np.arange(size)
+    ops = np.full((size, n_max + m_max), -1, dtype=np.int8)
+    positions = np.zeros((size, n_max + m_max), dtype=np.int64)
+    i = np.where(aligned, n, 0)
+    j = np.where(aligned, m, 0)
+    for step in range(n_max + m_max):
+        active = (i > 0) | (j > 0)
+        if not active.any():
+            break
+        up_i = np.maximum(i - 1, 0)
+        d = j - i + band
+        here = cost[rows, i, d]
+        mismatch = read_codes[rows, up_i] != ref_codes[rows, np.maximum(j - 1, 0)]
+        diagonal = (i > 0) & (j > 0) & (here == cost[rows, up_i, d] + mismatch)
+        insertion = ~diagonal & (i > 0) & (here == cost[rows, up_i, d + 1] + 1)
+        deletion = ~diagonal & ~insertion
+        ops[:, step] = np.where(active, np.where(diagonal, mismatch.astype(np.int8),
+                                                 np.where(insertion, 2, 3)), -1)
+        positions[:, step] = np.where(insertion, j, j - 1)
+        i = i - (active & (diagonal | insertion))
+        j = j - (active & (diagonal | deletion))
+    return ops, positions, aligned
+
+def add_bases(stats, lengths):
+    """Count the reference positions covered by reads of the given reference lengths."""
+    for length, count in zip(*np.unique(lengths, return_counts=True)):
+        stats['position_bases'][:length] += count
+
+def count_errors(stats, ids, ops, positions):
+    """Add the substitutions, insertions and deletions of aligned reads to the counters."""
+    for code, name in ((1, 'substitutions'), (2, 'insertions'), (3, 'deletions')):
+        found = ops == code
+        np.add.at(stats[name], ids, found.sum(axis=1))
+        np.add.at(stats['position_' + name], positions[found], 1)
+
+def analyze_batch(sequences, oligos, read_index, stats):
+    """Assign and align a batch of reads, adding to the counters of analyze_run."""
+    stats['reads'] += len(sequences)
+    assigned = assign_batch(sequences, oligos, read_index)
+
+    stats['unassigned'] += np.count_nonzero(assigned < 0)
+    np.add.at(stats['coverage'], assigned[assigned >= 0], 1)
+
+    substituted = {}
+    indels = []
+    for p, index in enumerate(assigned):
+        if index < 0:
+            continue
+        ref = oligos[index]
+        if sequences[p] == ref:
+            stats['exact'][index] += 1
+            stats['position_bases'][:len(ref)] += 1
+        elif len(sequences[p]) == len(ref):
+            substituted.setdefault(len(ref), []).append(p)
+        else:
+            indels.append(p)
+
+    # Reads with substitutions only do not need the alignment
+    for length, group in substituted.items():
+        ids = assigned[group]
+        mismatch = to_codes([sequences[p] for p in group]) != to_codes([oligos[index] for index in ids])
+        few = mismatch.sum(axis=1) <= MAX_SUBSTITUTIONS
+        np.add.at(stats['substitutions'], ids[few], mismatch[few].sum(axis=1))
+        stats['position_substitutions'][:length] += mismatch[few].sum(axis=0)
+        stats['position_bases'][:length] += np.count_nonzero(few)
+        indels.extend(p for p, keep in zip(group, few) if not keep)
+
+    if indels:
+        ids = assigned[indels]
+        refs = [oligos[index] for index in ids]
+        ops, positions, aligned = align_batch([sequences[p] for p in indels], refs)
+        stats['unaligned'] += np.count_nonzero(~aligned)
+        add_bases(stats, np.array([len(ref) for ref in refs])[aligned])
+        count_errors(stats, ids[aligned], ops[aligned], positions[aligned])
+
+def analyze_run(sequences, oligos, addresses, batch_size=BATCH_SIZE):
+    """
+    Assign every read to its reference oligo and collect error statistics.
+
+    Reads are processed in batches of batch_size, so memory is bounded by the
+    size of the reference pool and of one batch; the reads are only iterated
+    once.
+
+    Args:
+        sequences: Iterable of read sequences
+        oligos: Reference sequences
+        addresses: (row, col) of every reference sequence
+        batch_size: Number of reads assigned and aligned together
+
+    Returns:
+        Dictionary with the per-oligo counters ('coverage', 'exact',
+        'substitutions', 'insertions', 'deletions'), the per-position counters
+        ('position_bases', 'position_substitutions', 'position_insertions',
+        'position_deletions') and the number of 'reads', 'unassigned' and
+        'unaligned' reads
+    """
+    read_index = build_read_index(oligos)
+
+    n = len(oligos)
+    stats = {name: np.zeros(n, dtype=np.int64)
+             for name in ('coverage', 'exact', 'substitutions', 'insertions', 'deletions')}
+    for name in ('position_bases', 'position_substitutions', 'position_insertions', 'position_deletions'):
+        stats[name] = np.zeros(MAX_LENGTH + 1, dtype=np.int64)
+    stats['reads'] = stats['unassigned'] = stats['unaligned'] = 0
+
+    batch = []
+    for seq in sequences:
+        batch.append(seq)
+        if len(batch) == batch_size:
+            analyze_batch(batch, oligos, read_index, stats)
+            batch = []
+    if batch:
+        analyze_batch(batch, oligos, read_index, stats)
+    return stats
+
+if __name__ == "__main__":
+    oligos, addresses = load_reference(reference_file)
+    stats = analyze_run(read_sequences(file_path), oligos, addresses)
+
+    coverage = stats['coverage']
+    print(f"Reads: {stats['reads']}, unassigned: {stats['unassigned']}, not aligned: {stats['unaligned']}")
+    print(f"Coverage: mean {coverage.mean():.2f}, median {np.median(coverage):.0f}, "
+          f"min {coverage.min()}, max {coverage.max()}")
+    print(f"Dropouts: {np.count_nonzero(coverage == 0)} of {len(oligos)} oligos")
+    bases = max(stats['position_bases'].sum(), 1)
+    for name in ('substitutions', 'insertions', 'deletions'):
+        print(f"{name.capitalize()} rate: {stats['position_' + name].sum() / bases:.4%}")
+
+    with open('coverage.csv', 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['row', 'col', 'reads', 'exact', 'substitutions', 'insertions', 'deletions'])
+        for index, (row, col) in enumerate(addresses):
+            writer.writerow([row, col] + [int(stats[name][index]) for name in
+                                          ('coverage', 'exact', 'substitutions', 'insertions', 'deletions')])
+
+    with open('position_errors.csv', 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['position', 'bases', 'substitution_rate', 'insertion_rate', 'deletion_rate'])
+        for pos in range(MAX_LENGTH):
+            n_bases = stats['position_bases'][pos]
+            if n_bases == 0:
+                continue
+            writer.writerow([pos + 1, int(n_bases)] + [stats['position_' + name][pos] / n_bases for name in
+                                                        ('substitutions', 'insertions', 'deletions')])
+
+    print("Saved coverage.csv and position_errors.csv")
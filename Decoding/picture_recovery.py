@@ -1,8 +1,17 @@
 import csv
+import os
+import sys
 import numpy as np
+from to_picture import decode_cell, CELL_LENGTHS
+# 纠删码的参数和GF(256)运算直接使用 encoding.py 中的定义
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Encoding'))
+from encoding import (ERASURE_CODING, ERASURE_GROUP_ROWS, ERASURE_PARITY_ROWS, CELL_BYTES,
+                      cauchy_matrix, gf_matmul, gf_inverse, bytes_to_dna)
 #对填充的序列进行处理，主要是null和非法序列的判别
 filename = 'matrix.csv'
 
+DATA_ROWS = 341
+
 with open(filename, newline='', encoding='utf-8') as csvfile:
     reader = csv.reader(csvfile)
     rows = list(reader)
@@ -53,6 +62,70 @@ def fix_length_with_G(arr: np.ndarray) -> np.ndarray:
 
 
 
+#碱基序列与字节之间的转换，非法序列返回None
+def cell_to_bytes(cell, n_bytes):
+    bits = decode_cell(cell)
+    if bits is None:
+        return None
+    bits = bits.ljust(n_bytes * 8, '0')
+    return np.array([int(bits[k:k + 8], 2) for k in range(0, n_bytes * 8, 8)], dtype=np.uint8)
+
+def bytes_to_cell(values, length):
+    nt = {0: 'G', 1: 'C', 2: 'T', 3: 'A'}
+    cell = bytes_to_dna(values[:length // 5])
+    if length % 5:
+        tail = int(values[length // 5])
+        cell += ''.join(nt[(tail >> (6 - 2 * k)) & 3] for k in range(length % 5))
+    return cell
+
+#用校验行重建缺失或非法的格子，返回只包含数据行的矩阵、重建的格子数和校验失败的(组, 列)
+#可用的符号多于 group_rows 时，用多余的符号检验重建结果；检验失败说明有格子含有未被发现的错误，
+#此时不重建，缺失的格子留给后面的G填充处理
+def rebuild_erasures(arr: np.ndarray, group_rows=ERASURE_GROUP_ROWS, parity_rows=ERASURE_PARITY_ROWS):
+    arr_copy = arr[:DATA_ROWS].astype(object)
+    n_groups = -(-DATA_ROWS // group_rows)
+    generator = np.concatenate([np.eye(group_rows, dtype=np.uint8),
+                                cauchy_matrix(parity_rows, group_rows)])
+    rebuilt = 0
+    failed = []
+    for g in range(n_groups):
+        for j in range(arr.shape[1]):
+            data_idx = range(g * group_rows, (g + 1) * group_rows)
+            parity_idx = range(DATA_ROWS + g * parity_rows, DATA_ROWS + (g + 1) * parity_rows)
+            symbols = np.zeros((group_rows + parity_rows, CELL_BYTES[j]), dtype=np.uint8)
+            available = np.zeros(group_rows + parity_rows, dtype=bool)
+            for k, i in enumerate(list(data_idx) + list(parity_idx)):
+                if k < group_rows and i >= DATA_ROWS:
+                    available[k] = True  # 末组补齐的全零行
+                    continue
+                if i >= arr.shape[0]:
+                    continue
+                length = CELL_LENGTHS[j] if k < group_rows else 90
+                cell = arr[i, j].strip() if isinstance(arr[i, j], str) else ''
+                values = cell_to_bytes(cell, CELL_BYTES[j]) if len(cell) == length else None
+                if values is not None:
+                    symbols[k] = values
+                    available[k] = True
+            missing = np.flatnonzero(~available[:group_rows])
+            if len(missing) == 0 or available.sum() < group_rows:
+                continue
+            candidates = np.flatnonzero(available)
+            selected, unused = candidates[:group_rows], candidates[group_rows:]
+            data = gf_matmul(gf_inverse(generator[selected]), symbols[selected])
+            if len(unused) and (gf_matmul(generator[unused], data) != symbols[unused]).any():
+                failed.append((g, j))
+                continue
+            for k in missing:
+                arr_copy[g * group_rows + k, j] = bytes_to_cell(data[k], CELL_LENGTHS[j])
+                rebuilt = rebuilt + 1
+    return arr_copy, rebuilt, failed
+
+
+if ERASURE_CODING:
+    data_array, rebuilt, failed = rebuild_erasures(data_array)
+    print("纠删码重建的格子数", rebuilt)
+    for g, j in failed:
+        print(f"第{g + 1}组第{j + 1}列校验失败，未重建，缺失的格子用G填充")
 filled_data ,error_null = fill_individual_nulls_with_G(data_array)
 #print(filled_data)
 fixed,error_len = fix_length_with_G(filled_data)
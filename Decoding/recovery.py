@@ -1,29 +1,36 @@
+import os
+import sys
 import numpy as np
 import csv
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Encoding'))
+from encoding import parity_row_count, ENCODING_MODE, HIERARCHY_FACTORS
 #把DNA的测序序列填充到矩阵中
 # 指定文件路径
 file_path = "low_freq_5_percent.txt"
 error = 0
 seq_num = 0
 
+# 在线解码：边读边填充，所有格子的支持读数都达到阈值后提前停止读取
+ONLINE_MODE = False
+SUPPORT_THRESHOLD = 3  # 每个格子需要的相同读数
+SNAPSHOT_INTERVAL = 0  # 每读取多少条序列输出一次中间图像，0表示不输出
 
-# 打开文件并读取每一行的第一个空格之前的内容
-# 打开文件并读取每一行的第一个空格之前的内容
-with open(file_path, 'r') as file:
-    lines = file.readlines()
+# 读数带有引物/接头时，先用 trimming.py 去除引物并统一方向（引物在 trimming.py 中设置）
+TRIM_PRIMERS = False
 
-# 打开文件并读取所有行
-with open(file_path, 'r') as file:
-    lines = file.readlines()
+# encoding.py 启用纠删码（ERASURE_CODING）时，数据行之后还有校验行，行数由 encoding.py 的参数算出
+PARITY_ROWS = parity_row_count(341)
+MATRIX_SHAPE = (341 + PARITY_ROWS, 5)
 
-# 初始化筛选结果列表
-filtered_sequences = []
-dna_matrix =  np.empty((341, 5), dtype=object)#构建空白矩阵
 
-for line in lines[1:]:
-    # 提取第一个空格之前的内容
-    first_part = line.split(maxsplit=1)[0]
-    filtered_sequences.append(first_part)
+def read_sequences(file_path):
+    # 逐行读取文件，返回每一行第一个空格之前的内容（跳过表头）
+    with open(file_path, 'r') as file:
+        next(file, None)
+        for line in file:
+            parts = line.split(maxsplit=1)
+            if parts:
+                yield parts[0]
 
 def xuhao_binary(X):
     # 定义映射规则
@@ -49,52 +56,107 @@ def threebits_xuhao(X):
     }
     return inverse_mapping.get(X, None)
 
-
-for seq in filtered_sequences:
-    tmp_add = []
-    a=seq[0:1]
-    b=seq[1:3]
-    c=seq[3:5]
-    d=seq[5:6]
-    e=seq[6:8]
-    f=seq[8:10]
-    xuhaoa=xuhao_binary(a)#0:2
-    xuhaob=threebits_xuhao(b)#2:5
-    xuhaoc=threebits_xuhao(c)#5:8
-    xuhaod=xuhao_binary(d)#8:10
-    xuhaoe=threebits_xuhao(e)#10:13
-    xuhaof=threebits_xuhao(f)
-    tmp_add.extend([xuhaoa,xuhaob,xuhaoc,xuhaod,xuhaoe,xuhaof])
-    #print(tmp_add)
-
-    #concatenated_str = ''.join(tmp_add)
-    try:
-        concatenated_str = ''.join(tmp_add)
-    except TypeError as e:
-        print("错误的序列是",tmp_add,seq[0:10], {e})
-        error=error+1
-
-        continue
-    #print(concatenated_str)
+def decode_address(seq):
+    # 把前10个碱基解码为(行, 列)，地址中有非法碱基时返回None
+    tmp_add = [xuhao_binary(seq[0:1]),      #0:2
+               threebits_xuhao(seq[1:3]),   #2:5
+               threebits_xuhao(seq[3:5]),   #5:8
+               xuhao_binary(seq[5:6]),      #8:10
+               threebits_xuhao(seq[6:8]),   #10:13
+               threebits_xuhao(seq[8:10])]
+    if any(x is None for x in tmp_add):
+        return None
+    concatenated_str = ''.join(tmp_add)
     group_size = 4
     groups = [concatenated_str[i:i + group_size] for i in range(0, len(concatenated_str), group_size)]
     decimal_list = [int(b, 2) for b in groups]
     row=decimal_list[0]*100+decimal_list[1]*10+decimal_list[2]
     col=decimal_list[3]
-    #print(row)
-    try:
-        if dna_matrix[row-1][col-1] == None and (len(seq) == 100 or len(seq) == 87):
-            dna_matrix[row-1,col-1]=seq[10:]
-    except IndexError as e:
-        print("错误的序列是",seq[0:10],{e})
-        error = error + 18
-        continue
-    seq_num=seq_num+1
-
-print(error)
-with open('matrix.csv', 'w', newline='') as csvfile:
-    writer = csv.writer(csvfile)
-    writer.writerows(dna_matrix)
-
-print("矩阵已保存到 matrix.csv 文件中")
+    return row, col
+
+def online_decode(sequences, support_threshold=SUPPORT_THRESHOLD,
+                  snapshot_interval=SNAPSHOT_INTERVAL, on_snapshot=None):
+    # 在线解码：每个格子保存出现次数最多的序列，其次数即为该格子的支持度
+    # 所有格子的支持度都达到support_threshold后停止读取
+    # 返回 (矩阵, 支持度矩阵, 已读取的序列数, 错误数)
+    rows, cols = MATRIX_SHAPE
+    dna_matrix = np.empty(MATRIX_SHAPE, dtype=object)
+    support = np.zeros(MATRIX_SHAPE, dtype=int)
+    candidates = [[{} for _ in range(cols)] for _ in range(rows)]
+    confident = 0
+    n_read = 0
+    n_error = 0
+
+    for seq in sequences:
+        n_read = n_read + 1
+        address = decode_address(seq)
+        if address is None or not (1 <= address[0] <= rows and 1 <= address[1] <= cols):
+            n_error = n_error + 1
+        elif len(seq) == 100 or len(seq) == 87:
+            i, j = address[0] - 1, address[1] - 1
+            payload = seq[10:]
+            count = candidates[i][j].get(payload, 0) + 1
+            candidates[i][j][payload] = count
+            if count > support[i, j]:
+                dna_matrix[i, j] = payload
+                support[i, j] = count
+                if count == support_threshold:
+                    confident = confident + 1
+
+        if on_snapshot is not None and snapshot_interval > 0 and n_read % snapshot_interval == 0:
+            on_snapshot(dna_matrix, support, n_read)
+        if confident == rows * cols:
+            break
+
+    return dna_matrix, support, n_read, n_error
+
+def save_snapshot(dna_matrix, support, n_read):
+    # 把当前已填充的格子解码为中间图像，缺失的格子显示为白色
+    from to_picture import render_hierarchical, restore_pixel_matrix, restore_image
+    # 栅格模式下与 to_picture.py 一致：只把无法转换的符号解码为0，不丢弃整个格子
+    hierarchical = ENCODING_MODE == 'hierarchical'
+    factors = HIERARCHY_FACTORS if hierarchical else (1,)
+    matrix, _ = render_hierarchical(dna_matrix, factors=factors, strict=hierarchical)
+    restore_image(restore_pixel_matrix(matrix), path=f"snapshot_{n_read}.png", show=False)
+    print(f"已读取 {n_read} 条序列，已填充 {np.count_nonzero(support)} 个格子，"
+          f"{np.count_nonzero(support >= SUPPORT_THRESHOLD)} 个格子达到阈值")
+
+
+if __name__ == "__main__":
+    sequences = read_sequences(file_path)
+    if TRIM_PRIMERS:
+        from trimming import trim_stream
+        sequences = trim_stream(sequences)
+
+    if ONLINE_MODE:
+        dna_matrix, support, seq_num, error = online_decode(sequences, on_snapshot=save_snapshot)
+        print(f"读取了 {seq_num} 条序列，{np.count_nonzero(support >= SUPPORT_THRESHOLD)}/{support.size} 个格子达到阈值")
+        with open('support.csv', 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerows(support)
+    else:
+        dna_matrix =  np.empty(MATRIX_SHAPE, dtype=object)#构建空白矩阵
+
+        for seq in sequences:
+            address = decode_address(seq)
+            if address is None:
+                print("错误的序列是",seq[0:10])
+                error=error+1
+                continue
+            row, col = address
+            #print(row)
+            try:
+                if dna_matrix[row-1][col-1] == None and (len(seq) == 100 or len(seq) == 87):
+                    dna_matrix[row-1,col-1]=seq[10:]
+            except IndexError as e:
+                print("错误的序列是",seq[0:10],{e})
+                error = error + 18
+                continue
+            seq_num=seq_num+1
+
+    print(error)
+    with open('matrix.csv', 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerows(dna_matrix)
 
+    print("矩阵已保存到 matrix.csv 文件中")
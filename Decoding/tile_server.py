@@ -0,0 +1,249 @@
+import csv
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+from PIL import Image
+
+from to_picture import (render_codes, COLOR_ENCODING, CELL_LENGTHS, ENCODING_MODE,
+                        HIERARCHY_FACTORS, IMAGE_HEIGHT, IMAGE_WIDTH)
+
+# In-process decode service for repeated region queries
+filename = 'matrix_tmp.csv'
+HOST = '127.0.0.1'
+PORT = 8000
+
+TILE_SIZE = 64
+CACHE_SIZE = 512  # Maximum number of cached tiles / row ranges
+
+# RGB value of every color code
+PALETTE = np.array([COLOR_ENCODING[format(code, '02b')] for code in range(4)], dtype=np.uint8)
+
+
+class LRUCache:
+    """
+    Size-bounded least-recently-used cache, safe to share between threads.
+
+    Args:
+        max_entries: Number of entries kept before the oldest are evicted
+    """
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # get also reorders the entries, so reads need the lock as well
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, predicate=None):
+        """Drop the entries whose key matches predicate, or every entry."""
+        with self.lock:
+            if predicate is None:
+                self.entries.clear()
+                return
+            for key in [key for key in self.entries if predicate(key)]:
+                del self.entries[key]
+
+
+class TileService:
+    """
+    Serve decoded regions of an oligo matrix.
+
+    The matrix is parsed once; tiles and row ranges are decoded on first
+    request and kept in an LRU cache. The cache is invalidated when the matrix
+    file changes on disk or a cell is replaced through update_cell.
+
+    Args:
+        path: Path of the oligo matrix (e.g. matrix_tmp.csv)
+        mode: 'raster' or 'hierarchical', ENCODING_MODE of encoding.py by default
+        tile_size: Edge length of a tile in pixels
+        cache_size: Maximum number of cached tiles / row ranges
+    """
+
+    def __init__(self, path=filename, mode=ENCODING_MODE, tile_size=TILE_SIZE, cache_size=CACHE_SIZE):
+        self.path = path
+        self.factors = HIERARCHY_FACTORS if mode == 'hierarchical' else (1,)
+        self.tile_size = tile_size
+        self.cache = LRUCache(cache_size)
+        self.lock = threading.RLock()
+        self.version = None
+        self.data = None
+        self.canvas = None
+        self.refresh()
+
+    def refresh(self):
+        """Reload the matrix if the file changed since it was read."""
+        stat = os.stat(self.path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version == self.version:
+            return False
+        with self.lock:
+            with open(self.path, newline='', encoding='utf-8') as csvfile:
+                rows = list(csv.reader(csvfile))
+            self.data = np.array(rows, dtype=object)
+            self.canvas = None
+            self.cache.invalidate()
+            self.version = version
+        return True
+
+    def update_cell(self, row, col, seq):
+        """
+        Replace the payload of one cell and drop the cached regions it affects.
+
+        Args:
+            row: Matrix row, starting at 0
+            col: Matrix column, starting at 0
+            seq: New payload
+        """
+        with self.lock:
+            self.data[row, col] = seq
+            if self.factors != (1,):
+                # Hierarchical levels spread every cell over the whole image
+                self.canvas = None
+                self.cache.invalidate()
+                return
+            x_start = sum((n // 5) * 4 + n % 5 for n in CELL_LENGTHS[:col])
+            x_stop = x_start + (CELL_LENGTHS[col] // 5) * 4 + CELL_LENGTHS[col] % 5
+            self.cache.invalidate(lambda key: self._overlaps(key, row, x_start, x_stop))
+
+    def _overlaps(self, key, row, x_start, x_stop):
+        kind = key[0]
+        if kind == 'rows':
+            return key[1] <= row < key[2]
+        ty, tx = key[1], key[2]
+        return (ty * self.tile_size <= row < (ty + 1) * self.tile_size
+                and tx * self.tile_size < x_stop and x_start < (tx + 1) * self.tile_size)
+
+    def _decode(self, y_start, y_stop):
+        # Raster rows decode independently; hierarchical levels need the whole image
+        # Raster tiles keep the per-symbol fallback of to_picture.py
+        if self.factors == (1,):
+            return render_codes(self.data[y_start:y_stop], y_stop - y_start, IMAGE_WIDTH, self.factors,
+                                strict=False)[0]
+        if self.canvas is None:
+            self.canvas = render_codes(self.data, IMAGE_HEIGHT, IMAGE_WIDTH, self.factors)[0]
+        return self.canvas[y_start:y_stop]
+
+    def _region(self, key, y_start, y_stop, x_start, x_stop):
+        self.refresh()
+        codes = self.cache.get(key)
+        if codes is None:
+            with self.lock:
+                codes = self._decode(y_start, y_stop)[:, x_start:x_stop].copy()
+                self.cache.put(key, codes)
+        return codes
+
+    def tile(self, ty, tx):
+        """
+        Color codes (0-3) of one tile; border tiles are cropped to the image.
+
+        Raises:
+            IndexError: If the tile lies outside the image
+        """
+        size = self.tile_size
+        if not (0 <= ty * size < IMAGE_HEIGHT and 0 <= tx * size < IMAGE_WIDTH):
+            raise IndexError(f"Tile ({ty}, {tx}) is outside the image")
+        return self._region(('tile', ty, tx), ty * size, min((ty + 1) * size, IMAGE_HEIGHT),
+                            tx * size, min((tx + 1) * size, IMAGE_WIDTH))
+
+    def rows(self, start, stop):
+        """
+        Color codes (0-3) of the pixel rows start to stop - 1.
+
+        Raises:
+            IndexError: If the range is empty or outside the image
+        """
+        if not 0 <= start < stop <= IMAGE_HEIGHT:
+            raise IndexError(f"Row range {start}:{stop} is outside the image")
+        return self._region(('rows', start, stop), start, stop, 0, IMAGE_WIDTH)
+
+
+def encode_png(codes):
+    buffer = io.BytesIO()
+    Image.fromarray(PALETTE[codes]).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def make_handler(service):
+    """
+    Build the HTTP handler of a TileService.
+
+    Endpoints:
+        /tile?y=<tile row>&x=<tile column>[&format=png|json]
+        /rows?start=<first row>&stop=<last row + 1>[&format=png|json]
+    """
+    png_cache = LRUCache(service.cache.max_entries)
+
+    class TileHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            output = query.get('format', 'png')
+            try:
+                if url.path == '/tile':
+                    key = ('tile', int(query['y']), int(query['x']))
+                    codes = service.tile(key[1], key[2])
+                elif url.path == '/rows':
+                    key = ('rows', int(query['start']), int(query['stop']))
+                    codes = service.rows(key[1], key[2])
+                else:
+                    self.send_error(404)
+                    return
+            except (KeyError, ValueError, IndexError) as e:
+                self.send_error(400, str(e))
+                return
+
+            if output == 'json':
+                body = json.dumps(codes.tolist()).encode()
+                content_type = 'application/json'
+            else:
+                # The PNG is reused as long as the decoded region is the cached one
+                cached = png_cache.get(key)
+                if cached is not None and cached[0] is codes:
+                    body = cached[1]
+                else:
+                    body = encode_png(codes)
+                    png_cache.put(key, (codes, body))
+                content_type = 'image/png'
+
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return TileHandler
+
+
+if __name__ == "__main__":
+    service = TileService()
+    server = ThreadingHTTPServer((HOST, PORT), make_handler(service))
+    print(f"Serving {filename} on http://{HOST}:{PORT} (/tile?y=0&x=0, /rows?start=0&stop=10)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -1,10 +1,24 @@
 import csv
+import os
+import sys
 import numpy as np
 from PIL import Image
 
+# The pixel layout ('raster' or 'hierarchical') is read from encoding.py, so one switch drives both sides
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Encoding'))
+from encoding import ENCODING_MODE, HIERARCHY_FACTORS
+
 filename = 'matrix_tmp.csv'
 error = 0
 
+# Highest hierarchical level to render (None renders every available level)
+PREVIEW_LEVEL = None
+
+IMAGE_HEIGHT = 341
+IMAGE_WIDTH = 350
+# Payload length of the 5 oligos of a row
+CELL_LENGTHS = (90, 90, 90, 90, 77)
+
 COLOR_ENCODING = {
     '00': (255, 255, 255),  # White
     '01': (0, 0, 0),        # Black
@@ -93,6 +107,118 @@ def fill_matrix(binary_list):
             matrix[i][j] = binary_value
     return matrix
 
+def decode_cell(cell, strict=True):
+    """
+    Convert the payload of one oligo to binary codes.
+    
+    Args:
+        cell: Payload string (5 nt per 8 bits, trailing single nucleotides 2 bits each)
+        strict: If False, symbols that cannot be converted become '00' / '000'
+            like in the raster decoding of this script
+        
+    Returns:
+        Binary string of the payload or None if any symbol cannot be converted
+    """
+    n_groups = len(cell) // 5
+    bits = []
+    for k in range(n_groups):
+        single = cell[k * 5:k * 5 + 5]
+        bits.append(get_mapping_value(single[0]))
+        bits.append(get_tri_mapping_value(single[1:3]))
+        bits.append(get_tri_mapping_value(single[3:5]))
+    for char in cell[n_groups * 5:]:
+        bits.append(get_mapping_value(char))
+    if not strict:
+        bits = [b if b is not None else ('00' if k % 3 == 0 or k >= n_groups * 3 else '000')
+                for k, b in enumerate(bits)]
+    if any(b is None for b in bits):
+        return None
+    return ''.join(bits)
+
+def hierarchical_stream_order(height, width, factors=HIERARCHY_FACTORS):
+    """
+    Pixel of every position of the hierarchical stream, following the level
+    layout of hierarchical_pixel_order in encoding.py.
+    
+    Returns:
+        Tuple containing:
+        - order: Flat pixel index (y * width + x) of every stream position
+        - level_sizes: Number of pixels in each level
+    """
+    yy, xx = np.mgrid[0:height, 0:width]
+    level = np.full((height, width), len(factors) - 1)
+    for k in range(len(factors) - 2, -1, -1):
+        level[(yy % factors[k] == 0) & (xx % factors[k] == 0)] = k
+    flat_level = level.ravel()
+    order = np.argsort(flat_level, kind='stable')
+    level_sizes = np.bincount(flat_level, minlength=len(factors))
+    return order, level_sizes
+
+def render_codes(data_array, height=IMAGE_HEIGHT, width=IMAGE_WIDTH,
+                 factors=HIERARCHY_FACTORS, max_level=None, strict=True):
+    """
+    Render the best available resolution of a hierarchically encoded image.
+    
+    Cells that are empty, 'null' or fail to convert (including the 'G' filling
+    of picture_recovery.py) are treated as missing. Each missing pixel takes the
+    value of the nearest available pixel of a coarser level, so a preview is
+    produced as soon as the thumbnail oligos are present.
+    
+    Args:
+        data_array: Matrix of oligo payloads (rows x 5)
+        height: Image height in pixels
+        width: Image width in pixels
+        factors: Decreasing subsampling factors used by the encoder
+        max_level: Highest level to use, None uses every level
+        strict: If False, a cell of the right length is kept and only its
+            unconvertible symbols are decoded as 0, matching the raster decoding
+        
+    Returns:
+        Tuple containing:
+        - canvas: Array (height x width) of color codes 0-3
+        - coverage: Fraction of pixels of each level that were recovered
+    """
+    stream = []
+    for row in data_array:
+        for j, cell in enumerate(row):
+            cell = cell.strip() if isinstance(cell, str) else ''
+            n_pixels = (CELL_LENGTHS[j] // 5) * 4 + CELL_LENGTHS[j] % 5
+            bits = decode_cell(cell, strict) if len(cell) == CELL_LENGTHS[j] else None
+            if bits is None:
+                stream.extend([-1] * n_pixels)
+            else:
+                stream.extend(int(bits[k:k + 2], 2) for k in range(0, len(bits), 2))
+    stream = np.array(stream[:height * width], dtype=np.int8)
+
+    order, level_sizes = hierarchical_stream_order(height, width, factors)
+    if max_level is not None:
+        stream[int(level_sizes[:max_level + 1].sum()):] = -1
+    canvas = np.full(height * width, -1, dtype=np.int8)
+    canvas[order[:len(stream)]] = stream
+
+    offsets = np.concatenate(([0], np.cumsum(level_sizes)))
+    coverage = [float(np.mean(stream[offsets[k]:offsets[k + 1]] >= 0)) if level_sizes[k] else 0.0
+                for k in range(len(factors))]
+
+    canvas = canvas.reshape(height, width)
+    yy, xx = np.mgrid[0:height, 0:width]
+    for step in sorted(f for f in factors if f > 1):
+        parent = canvas[(yy // step) * step, (xx // step) * step]
+        missing = canvas < 0
+        canvas[missing] = parent[missing]
+    canvas[canvas < 0] = 0
+    return canvas, coverage
+
+def render_hierarchical(data_array, height=IMAGE_HEIGHT, width=IMAGE_WIDTH,
+                        factors=HIERARCHY_FACTORS, max_level=None, strict=True):
+    """
+    Same as render_codes, with the result as a matrix of binary color codes
+    for restore_pixel_matrix.
+    """
+    canvas, coverage = render_codes(data_array, height, width, factors, max_level, strict)
+    matrix = [[format(int(v), '02b') for v in row] for row in canvas]
+    return matrix, coverage
+
 def restore_pixel_matrix(binary_matrix):
     height = len(binary_matrix)
     width = len(binary_matrix[0]) if height > 0 else 0
@@ -111,7 +237,7 @@ def restore_pixel_matrix(binary_matrix):
 
     return pixel_matrix
 
-def restore_image(pixel_matrix):
+def restore_image(pixel_matrix, path="del.png", show=True):
     height = len(pixel_matrix)
     width = len(pixel_matrix[0]) if height > 0 else 0
     image = Image.new('RGB', (width, height))
@@ -120,8 +246,9 @@ def restore_image(pixel_matrix):
         for x in range(width):
             image.putpixel((x, y), pixel_matrix[y][x])
     
-    image.show()
-    image.save("del.png")  # Save the restored image
+    if show:
+        image.show()
+    image.save(path)  # Save the restored image
 
 def process_image(image_path):
     """
@@ -172,46 +299,51 @@ if __name__ == "__main__":
         data_array = np.array(rows)
     print("Matrix has been read")
 
-    binary_result = []
+    if ENCODING_MODE == 'hierarchical':
+        matrix, coverage = render_hierarchical(data_array, max_level=PREVIEW_LEVEL)
+        for level, fraction in enumerate(coverage):
+            print(f"Level {level}: {fraction:.1%} of pixels recovered")
+    else:
+        binary_result = []
     
-    for i in range(341):
-        row_dna = data_array[i]
-        row_dna = ''.join(row_dna)
-        row_binary = []
-        row_dna_front = row_dna[0:435]
-        row_dna_5 = [row_dna_front[i:i+5] for i in range(0, len(row_dna_front), 5)]
-        binary_result_tmp = []
+        for i in range(341):
+            row_dna = data_array[i]
+            row_dna = ''.join(row_dna)
+            row_binary = []
+            row_dna_front = row_dna[0:435]
+            row_dna_5 = [row_dna_front[i:i+5] for i in range(0, len(row_dna_front), 5)]
+            binary_result_tmp = []
         
-        for single in row_dna_5:
-            a = char_to_number(single[0])
-            b = get_tri_mapping_value(single[1:3])
-            c = get_tri_mapping_value(single[3:5])
+            for single in row_dna_5:
+                a = char_to_number(single[0])
+                b = get_tri_mapping_value(single[1:3])
+                c = get_tri_mapping_value(single[3:5])
             
-            if a is None:
-                print(f"Error: Cannot convert character {single[0]} to binary")
-                error += 1
-                a = '00'
-            if b is None:
-                print(f"Error: Cannot convert string {single[1:3]} to binary")
-                error += 1
-                b = '000'
-            if c is None:
-                print(f"Error: Cannot convert string {single[3:5]} to binary")
-                error += 1
-                c = '000'
+                if a is None:
+                    print(f"Error: Cannot convert character {single[0]} to binary")
+                    error += 1
+                    a = '00'
+                if b is None:
+                    print(f"Error: Cannot convert string {single[1:3]} to binary")
+                    error += 1
+                    b = '000'
+                if c is None:
+                    print(f"Error: Cannot convert string {single[3:5]} to binary")
+                    error += 1
+                    c = '000'
             
-            binary_result_tmp.append([a, b, c])
+                binary_result_tmp.append([a, b, c])
         
-        every_result = ''.join(''.join(inner_list) for inner_list in binary_result_tmp)
-        row_dna_4 = row_dna[435:437]
-        d_t = row_dna_4[0:1]
-        e_t = row_dna_4[1:2]
-        d = get_mapping_value(d_t)
-        e = get_mapping_value(e_t)
-        every_result += d + e
-        binary_result.append(every_result)
-    
-    matrix = fill_matrix(binary_result)
+            every_result = ''.join(''.join(inner_list) for inner_list in binary_result_tmp)
+            row_dna_4 = row_dna[435:437]
+            d_t = row_dna_4[0:1]
+            e_t = row_dna_4[1:2]
+            d = get_mapping_value(d_t)
+            e = get_mapping_value(e_t)
+            every_result += d + e
+            binary_result.append(every_result)
+        
+        matrix = fill_matrix(binary_result)
     pixel_matrix = restore_pixel_matrix(matrix)
     restore_image(pixel_matrix)
     
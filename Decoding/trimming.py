@@ -0,0 +1,232 @@
+import numpy as np
+from recovery import read_sequences
+
+# Primer trimming and orientation of raw reads
+# Writes reads that start with the 10 nt address, to be used as the input of recovery.py
+file_path = "low_freq_5_percent.txt"
+output_path = "trimmed_reads.txt"
+
+# Primers of the library, 5'->3'. The reverse primer anneals to the 3' end, so
+# a forward read ends with its reverse complement.
+FORWARD_PRIMER = ''
+REVERSE_PRIMER = ''
+
+MAX_PRIMER_MISMATCHES = 2
+# Every primer with at most MAX_PRIMER_MISMATCHES keeps an exact seed as long as
+# (primer length + 1) > (MAX_PRIMER_MISMATCHES + 1) * SEED_SIZE
+SEED_SIZE = 6
+SEARCH_WINDOW = 20          # Primer starts further into the read are not searched
+BATCH_SIZE = 4096
+
+NUCLEOTIDE_CODES = np.full(256, 4, dtype=np.uint8)
+for code, base in enumerate('ACGT'):
+    NUCLEOTIDE_CODES[ord(base)] = code
+    NUCLEOTIDE_CODES[ord(base.lower())] = code
+COMPLEMENT_CODES = np.array([3, 2, 1, 0, 4], dtype=np.uint8)
+COMPLEMENT = str.maketrans('ACGTacgt', 'TGCAtgca')
+
+
+def reverse_complement(seq):
+    return seq.translate(COMPLEMENT)[::-1]
+
+def encode_batch(sequences):
+    """
+    Convert reads to a matrix of nucleotide codes.
+
+    Args:
+        sequences: List of read strings
+
+    Returns:
+        Tuple containing:
+        - codes: uint8 matrix (reads x longest read), A/C/G/T = 0-3, other or padding = 4
+        - lengths: Length of every read
+    """
+    lengths = np.array([len(seq) for seq in sequences], dtype=np.int64)
+    width = max(int(lengths.max()), 1) if len(sequences) else 1
+    buffer = np.frombuffer(''.join(seq.ljust(width, 'N') for seq in sequences).encode('ascii', 'replace'),
+                           dtype=np.uint8)
+    return NUCLEOTIDE_CODES[buffer].reshape(len(sequences), width), lengths
+
+def reverse_complement_batch(codes, lengths):
+    positions = lengths[:, None] - 1 - np.arange(codes.shape[1])[None, :]
+    rows = np.arange(codes.shape[0])[:, None]
+    flipped = COMPLEMENT_CODES[codes[rows, np.clip(positions, 0, None)]]
+    flipped[positions < 0] = 4
+    return flipped
+
+def build_seed_table(primer, k=SEED_SIZE):
+    """
+    Precompute the seed index of a primer.
+
+    Args:
+        primer: Primer sequence
+        k: Seed length
+
+    Returns:
+        Array of size 4**k giving the offset of each k-mer in the primer, -1 if
+        the k-mer does not occur or occurs more than once
+    """
+    table = np.full(4 ** k, -1, dtype=np.int16)
+    seen = set()
+    codes = NUCLEOTIDE_CODES[np.frombuffer(primer.encode('ascii'), dtype=np.uint8)]
+    for offset in range(len(primer) - k + 1):
+        kmer = codes[offset:offset + k]
+        if (kmer > 3).any():
+            continue
+        value = int(np.dot(kmer.astype(np.int64), 4 ** np.arange(k - 1, -1, -1)))
+        table[value] = -1 if value in seen else offset
+        seen.add(value)
+    return table
+
+def kmer_values(codes, k=SEED_SIZE):
+    """Integer value of every k-mer of every read, -1 where the k-mer contains other than A/C/G/T."""
+    n_values = codes.shape[1] - k + 1
+    values = np.zeros((codes.shape[0], n_values), dtype=np.int32)
+    invalid = np.zeros(values.shape, dtype=bool)
+    for i in range(k):
+        column = codes[:, i:i + n_values]
+        values = values * 4 + (column & 3)
+        invalid |= column > 3
+    values[invalid] = -1
+    return values
+
+def locate_primer(region, primer, table):
+    """
+    Find a primer starting within the first SEARCH_WINDOW positions of a region.
+
+    Each seed hit votes for the primer start it implies; the start with the
+    most votes is verified by counting mismatches over the whole primer.
+
+    Args:
+        region: Nucleotide codes of the searched part of every read
+            (SEARCH_WINDOW + primer length positions)
+        primer: Primer sequence
+        table: Seed table of the primer
+
+    Returns:
+        Tuple containing:
+        - start: Primer start in the region (-1 if not found)
+        - mismatches: Mismatches of the primer at that start
+    """
+    n_reads = region.shape[0]
+    values = kmer_values(region)
+    offsets = np.where(values >= 0, table[np.clip(values, 0, None)], -1)
+    starts = np.arange(values.shape[1])[None, :] - offsets
+    valid = (offsets >= 0) & (starts >= 0) & (starts <= SEARCH_WINDOW)
+
+    # Vote for the most frequent implied start
+    n_bins = SEARCH_WINDOW + 1
+    flat = (np.arange(n_reads)[:, None] * n_bins + starts)[valid]
+    votes = np.bincount(flat, minlength=n_reads * n_bins).reshape(n_reads, n_bins)
+    start = votes.argmax(axis=1)
+
+    primer_codes = NUCLEOTIDE_CODES[np.frombuffer(primer.encode('ascii'), dtype=np.uint8)]
+    columns = start[:, None] + np.arange(len(primer))[None, :]
+    mismatches = (region[np.arange(n_reads)[:, None], columns] != primer_codes[None, :]).sum(axis=1)
+
+    found = (votes.max(axis=1) > 0) & (mismatches <= MAX_PRIMER_MISMATCHES)
+    return np.where(found, start, -1), mismatches
+
+def read_region(codes, lengths, size, from_end=False):
+    """Take the first (or last) size positions of every read, padded with 4."""
+    positions = np.arange(size)[None, :]
+    if from_end:
+        positions = lengths[:, None] - size + positions
+    else:
+        positions = np.broadcast_to(positions, (codes.shape[0], size))
+    inside = (positions >= 0) & (positions < lengths[:, None])
+    region = codes[np.arange(codes.shape[0])[:, None], np.clip(positions, 0, codes.shape[1] - 1)]
+    return np.where(inside, region, 4).astype(np.uint8)
+
+def trim_batch(sequences, forward_primer=FORWARD_PRIMER, reverse_primer=REVERSE_PRIMER):
+    """
+    Orient and trim a batch of reads.
+
+    A read is used in the orientation in which the forward primer is found
+    with the fewest mismatches near its 5' end. The insert ends where the
+    reverse complement of the reverse primer starts, or at the end of the read
+    if it is not found.
+
+    Args:
+        sequences: List of read strings
+        forward_primer: Forward primer, 5'->3'
+        reverse_primer: Reverse primer, 5'->3'
+
+    Returns:
+        List with the trimmed read (address + payload) of every input read,
+        None for reads without forward primer
+    """
+    if not forward_primer:
+        raise ValueError("FORWARD_PRIMER must be set to trim reads")
+    if not sequences:
+        return []
+
+    forward_table = build_seed_table(forward_primer)
+    tail_primer = reverse_complement(reverse_primer)
+    tail_table = build_seed_table(tail_primer) if tail_primer else None
+
+    codes, lengths = encode_batch(sequences)
+    candidates = []
+    for oriented in (codes, reverse_complement_batch(codes, lengths)):
+        head = read_region(oriented, lengths, SEARCH_WINDOW + len(forward_primer))
+        start, mismatches = locate_primer(head, forward_primer, forward_table)
+        insert_start = np.where(start >= 0, start + len(forward_primer), -1)
+        insert_end = lengths.copy()
+        if tail_table is not None:
+            size = SEARCH_WINDOW + len(tail_primer)
+            tail = read_region(oriented, lengths, size, from_end=True)
+            tail_start, _ = locate_primer(tail, tail_primer, tail_table)
+            tail_start = np.where(tail_start >= 0, lengths - size + tail_start, -1)
+            insert_end = np.where(tail_start > insert_start, tail_start, lengths)
+        candidates.append((insert_start, insert_end, np.where(start >= 0, mismatches, len(forward_primer) + 1)))
+
+    (fwd_start, fwd_end, fwd_mm), (rev_start, rev_end, rev_mm) = candidates
+    use_reverse = rev_mm < fwd_mm
+    trimmed = []
+    for i, seq in enumerate(sequences):
+        if use_reverse[i]:
+            trimmed.append(reverse_complement(seq)[rev_start[i]:rev_end[i]])
+        elif fwd_start[i] >= 0:
+            trimmed.append(seq[fwd_start[i]:fwd_end[i]])
+        else:
+            trimmed.append(None)
+    return trimmed
+
+def trim_stream(sequences, batch_size=BATCH_SIZE):
+    """
+    Trim a stream of reads batch by batch, dropping reads without forward primer.
+
+    Args:
+        sequences: Iterable of read strings
+        batch_size: Number of reads processed together
+
+    Yields:
+        Trimmed reads starting with the address
+    """
+    batch = []
+    for seq in sequences:
+        batch.append(seq)
+        if len(batch) == batch_size:
+            yield from (read for read in trim_batch(batch) if read)
+            batch = []
+    if batch:
+        yield from (read for read in trim_batch(batch) if read)
+
+
+if __name__ == "__main__":
+    n_read = 0
+    n_trimmed = 0
+
+    def counted(sequences):
+        global n_read
+        for seq in sequences:
+            n_read = n_read + 1
+            yield seq
+
+    with open(output_path, 'w') as file:
+        file.write("sequence\n")
+        for read in trim_stream(counted(read_sequences(file_path))):
+            file.write(read + "\n")
+            n_trimmed = n_trimmed + 1
+
+    print(f"{n_trimmed} of {n_read} reads trimmed, saved to {output_path}")
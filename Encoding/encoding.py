@@ -12,6 +12,7 @@ Version: 1.0
 """
 
 from PIL import Image
+import numpy as np
 import csv
 import itertools
 from typing import List, Tuple, Dict, Optional, Any
@@ -70,6 +71,54 @@ INT_TO_DINUCLEOTIDE: Dict[int, str] = {
     7: 'AG'
 }
 
+# Pixel layout of the encoded stream
+# "raster" writes pixels row-major at full resolution; "hierarchical" writes a
+# downsampled thumbnail first, followed by the refinement levels
+ENCODING_MODE: str = "raster"
+
+# Subsampling factor of each hierarchical level, from thumbnail to full resolution
+HIERARCHY_FACTORS: Tuple[int, ...] = (4, 2, 1)
+
+# Cross-oligo erasure code
+# Every ERASURE_GROUP_ROWS data rows get ERASURE_PARITY_ROWS parity rows, which
+# rebuild up to ERASURE_PARITY_ROWS missing oligos per column and group
+ERASURE_CODING: bool = False
+ERASURE_GROUP_ROWS: int = 31
+ERASURE_PARITY_ROWS: int = 4
+
+# Payload bytes of each oligo column (the 4 trailing bits of a row are padded to a byte)
+CELL_BYTES: Tuple[int, ...] = (18, 18, 18, 18, 16)
+
+
+def parity_row_count(data_rows: int, group_rows: int = ERASURE_GROUP_ROWS,
+                     parity_rows: int = ERASURE_PARITY_ROWS) -> int:
+    """Number of parity rows appended after data_rows data rows (0 without erasure coding)."""
+    if not ERASURE_CODING:
+        return 0
+    return -(-data_rows // group_rows) * parity_rows
+
+
+def _gf256_tables() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Build exp, log and multiplication tables of GF(256) (polynomial 0x11d)."""
+    exp = np.zeros(512, dtype=np.int32)
+    log = np.zeros(256, dtype=np.int32)
+    value = 1
+    for i in range(255):
+        exp[i] = value
+        log[value] = i
+        value <<= 1
+        if value & 0x100:
+            value ^= 0x11d
+    exp[255:510] = exp[0:255]
+    
+    mul = exp[log[:, None] + log[None, :]].astype(np.uint8)
+    mul[0, :] = 0
+    mul[:, 0] = 0
+    return exp, log, mul
+
+
+GF_EXP, GF_LOG, GF_MUL = _gf256_tables()
+
 
 # Core Functions
 # ==============
@@ -279,6 +328,212 @@ def create_matrix_from_string_list(string_list: List[str], n: int = 5) -> List[L
     return matrix
 
 
+def binary_row_to_dna(row_bits: str) -> str:
+    """
+    Convert one row of binary color codes to its DNA sequence.
+    
+    Every 8-bit group becomes one nucleotide and two dinucleotides; the trailing
+    4 bits become two nucleotides.
+    
+    Args:
+        row_bits: Binary string of one image row (700 bits for a 350 pixel row)
+        
+    Returns:
+        DNA sequence of the row (437 nt for a 350 pixel row)
+    """
+    m = split_string_into_groups(row_bits)
+    xl, yl = last_four_bits(m[-1])
+    
+    dna = []
+    for group in m[:-1]:
+        x, y, z = convert_binary_parts(group)
+        dna.append(get_mapping_value(x))
+        dna.append(get_tri_mapping_value(y))
+        dna.append(get_tri_mapping_value(z))
+    
+    dna.append(get_mapping_value(xl))
+    dna.append(get_mapping_value(yl))
+    return ''.join(dna)
+
+
+def hierarchical_pixel_order(height: int, width: int,
+                             factors: Tuple[int, ...] = HIERARCHY_FACTORS) -> List[List[Tuple[int, int]]]:
+    """
+    Assign every pixel to a resolution level.
+    
+    A pixel belongs to the first level whose factor divides both of its
+    coordinates, so level 0 is a thumbnail sampled every factors[0] pixels and
+    each following level adds the pixels needed to reach the next resolution.
+    
+    Args:
+        height: Image height in pixels
+        width: Image width in pixels
+        factors: Decreasing subsampling factors, the last one must be 1
+        
+    Returns:
+        One list of (y, x) positions per level, each in row-major order
+    """
+    if factors[-1] != 1:
+        raise ValueError("The last hierarchy factor must be 1.")
+    
+    levels = [[] for _ in factors]
+    for y in range(height):
+        for x in range(width):
+            for level, factor in enumerate(factors):
+                if y % factor == 0 and x % factor == 0:
+                    levels[level].append((y, x))
+                    break
+    return levels
+
+
+def hierarchical_rows(binary_matrix: List[List[str]],
+                      factors: Tuple[int, ...] = HIERARCHY_FACTORS) -> List[str]:
+    """
+    Rearrange a binary matrix into rows of bits with the thumbnail level first.
+    
+    The levels are written one after another, so the thumbnail occupies the
+    lowest oligo addresses and each refinement level the following address
+    range. The stream keeps the size of the raster layout (341 rows of 5 oligos
+    for the demo image), so the decoding scripts work unchanged.
+    
+    Args:
+        binary_matrix: Matrix of binary color codes from process_image
+        factors: Decreasing subsampling factors, the last one must be 1
+        
+    Returns:
+        Binary string of every row, to be converted with binary_row_to_dna
+    """
+    height = len(binary_matrix)
+    width = len(binary_matrix[0]) if height > 0 else 0
+    levels = hierarchical_pixel_order(height, width, factors)
+    
+    bits = ''.join(binary_matrix[y][x] for level in levels for y, x in level)
+    row_length = width * 2
+    return [bits[i:i + row_length] for i in range(0, len(bits), row_length)]
+
+
+def bytes_to_dna(values: List[int]) -> str:
+    """
+    Convert bytes to DNA, one nucleotide and two dinucleotides per byte.
+    
+    Args:
+        values: Byte values (0-255)
+        
+    Returns:
+        DNA sequence of 5 nt per byte
+    """
+    dna = []
+    for value in values:
+        x, y, z = convert_binary_parts(format(int(value), '08b'))
+        dna.append(get_mapping_value(x))
+        dna.append(get_tri_mapping_value(y))
+        dna.append(get_tri_mapping_value(z))
+    return ''.join(dna)
+
+
+def cauchy_matrix(parity_rows: int, data_rows: int) -> np.ndarray:
+    """
+    Build the Cauchy matrix of a systematic Reed-Solomon erasure code.
+    
+    Together with the identity it forms a generator in which any data_rows
+    rows are invertible, so any data_rows surviving oligos of a column rebuild
+    the others.
+    
+    Args:
+        parity_rows: Number of parity symbols per code word
+        data_rows: Number of data symbols per code word
+        
+    Returns:
+        Matrix of GF(256) elements with shape (parity_rows, data_rows)
+        
+    Raises:
+        ValueError: If the code word is longer than 256 symbols
+    """
+    if parity_rows + data_rows > 256:
+        raise ValueError("Code word length must not exceed 256.")
+    
+    x = np.arange(parity_rows)[:, None]
+    y = np.arange(parity_rows, parity_rows + data_rows)[None, :]
+    return GF_EXP[255 - GF_LOG[x ^ y]].astype(np.uint8)
+
+
+def gf_matmul(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Multiply matrices over GF(256).
+    
+    Args:
+        a: Matrix with shape (..., m, k)
+        b: Matrix with shape (..., k, n)
+        
+    Returns:
+        Matrix with shape (..., m, n)
+    """
+    products = GF_MUL[a[..., :, :, None], b[..., None, :, :]]
+    return np.bitwise_xor.reduce(products, axis=-2)
+
+
+def gf_inverse(matrix: np.ndarray) -> np.ndarray:
+    """
+    Invert a square matrix over GF(256) by Gauss-Jordan elimination.
+    
+    Args:
+        matrix: Invertible matrix of GF(256) elements
+        
+    Returns:
+        Inverse matrix
+    """
+    n = matrix.shape[0]
+    aug = np.concatenate([matrix, np.eye(n, dtype=np.uint8)], axis=1)
+    for col in range(n):
+        pivot = col + int(np.flatnonzero(aug[col:, col])[0])
+        aug[[col, pivot]] = aug[[pivot, col]]
+        aug[col] = GF_MUL[GF_EXP[255 - GF_LOG[aug[col, col]]], aug[col]]
+        factors = aug[:, col].copy()
+        factors[col] = 0
+        aug ^= GF_MUL[factors[:, None], aug[col][None, :]]
+    return aug[:, n:]
+
+
+def encode_parity_rows(row_bits: List[str], group_rows: int = ERASURE_GROUP_ROWS,
+                       parity_rows: int = ERASURE_PARITY_ROWS) -> List[List[str]]:
+    """
+    Compute the parity oligos of the cross-oligo erasure code.
+    
+    Data rows are split into groups of group_rows (the last group is padded
+    with zero rows that are not stored). For every group, column and byte
+    position the data bytes form a Reed-Solomon code word with parity_rows
+    parity bytes.
+    
+    Args:
+        row_bits: Binary string of every data row (700 bits each)
+        group_rows: Number of data rows per group
+        parity_rows: Number of parity rows per group
+        
+    Returns:
+        Parity rows of 5 oligo payloads (90 nt each), group by group
+    """
+    n_groups = -(-len(row_bits) // group_rows)
+    row_length = sum(CELL_BYTES) * 8
+    
+    data = np.zeros((n_groups * group_rows, sum(CELL_BYTES)), dtype=np.uint8)
+    for i, bits in enumerate(row_bits):
+        padded = bits.ljust(row_length, '0')
+        data[i] = [int(padded[k:k + 8], 2) for k in range(0, row_length, 8)]
+    
+    data = data.reshape(n_groups, group_rows, -1)
+    parity = gf_matmul(cauchy_matrix(parity_rows, group_rows), data).reshape(-1, data.shape[-1])
+    
+    cell_starts = np.cumsum((0,) + CELL_BYTES)
+    parity_cells = []
+    for row in parity:
+        cells = []
+        for j in range(len(CELL_BYTES)):
+            values = list(row[cell_starts[j]:cell_starts[j + 1]]) + [0] * (18 - CELL_BYTES[j])
+            cells.append(bytes_to_dna(values))
+        parity_cells.append(cells)
+    return parity_cells
+
+
 # Main Execution
 # ==============
 
@@ -304,32 +559,18 @@ if __name__ == "__main__":
         exit(1)
     
     # Convert binary matrix to DNA sequence
-    DNA = []
-    dna = []
-    
-    for a in binaries:
-        result = ''.join(a)
-        m = split_string_into_groups(result)
-        xl, yl = last_four_bits(m[87])
-        d1 = get_mapping_value(xl)
-        d2 = get_mapping_value(yl)
-        
-        for i in range(87):
-            x, y, z = convert_binary_parts(m[i])
-            N1 = get_mapping_value(x)
-            dna.append(N1)
-            N2 = get_tri_mapping_value(y)
-            dna.append(N2)
-            N3 = get_tri_mapping_value(z)
-            dna.append(N3)
-        
-        dna.append(d1)
-        dna.append(d2)
-        DNA = ''.join(dna)
+    if ENCODING_MODE == "hierarchical":
+        row_bits = hierarchical_rows(binaries)
+    else:
+        row_bits = [''.join(a) for a in binaries]
+    DNA = ''.join(binary_row_to_dna(bits) for bits in row_bits)
     
     # Create DNA matrix and process further
     DNA_matrix = string_to_matrix(DNA, 437)
     y = split_matrix_rows(DNA_matrix, 90)
+    if ERASURE_CODING:
+        # Parity rows are addressed after the data rows
+        y.extend(encode_parity_rows(row_bits))
     row_list = generate_indexed_list(y)
     
     # Process indexed list to create nucleotide sequences